@@ -1,17 +1,20 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
 import csv
+import functools
+import glob
+import locale
 import os
+import re
 import shutil
-import subprocess
 import sys
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from datetime import datetime
 from pathlib import Path
-from typing import Iterable, List, Sequence, Tuple, Optional, Set
+from typing import Any, Callable, Iterable, List, Sequence, Tuple, Optional, Protocol, Set, TextIO
 
 try:
     from tqdm import tqdm  # type: ignore
@@ -19,6 +22,23 @@ except Exception:
     tqdm = None  # graceful fallback
 
 ALLOWED_SUFFIXES: Set[str] = {".pdf", ".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp"}
+# one C-level search per file name instead of splitext() + lower() + set lookup;
+# the lookbehind requires a non-empty stem, so a dotfile named ".pdf" is not a match (as with Path.suffix)
+_SUFFIX_RE = re.compile(
+    r"(?<=[^/\\])(?:" + "|".join(re.escape(x) for x in sorted(ALLOWED_SUFFIXES)) + r")\Z",
+    re.IGNORECASE,
+)
+LOG_HEAD_CHARS = 1200
+LOG_HEADER = ["When", "Input", "Output", "ReturnCode", "DurationSec", "OutputLogHead"]
+LOG_FLUSH_ROWS = 50
+LOG_FLUSH_INTERVAL_S = 0.1
+_NL_TABLE = str.maketrans("\n\r", "  ")
+PROGRESS_BATCH = 8
+PROGRESS_INTERVAL_S = 0.1
+
+
+class RowWriter(Protocol):
+    def writerow(self, row: Iterable[Any]) -> Any: ...
 
 
 @dataclass
@@ -30,52 +50,118 @@ class JobResult:
     log_head: str
 
 
+@functools.cache
 def which_ocrmypdf() -> Optional[str]:
     exe = shutil.which("ocrmypdf")
     return exe
 
 
+def _walk(root: Path) -> Iterable[Path]:
+    # single pass over the tree; DirEntry caches the file type so most entries need no stat()
+    has_suffix = _SUFFIX_RE.search
+    stack = [os.fspath(root)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except PermissionError:
+            # unreadable subfolder: skip it like rglob/os.walk do instead of aborting the run
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif has_suffix(entry.name) is not None and entry.is_file():
+                    yield Path(entry.path)
+
+
+def _list_dir(root: Path) -> Iterable[Path]:
+    has_suffix = _SUFFIX_RE.search
+    with os.scandir(root) as it:
+        for entry in it:
+            if has_suffix(entry.name) is not None and entry.is_file():
+                yield Path(entry.path)
+
+
+def _expand_one(raw: str, recursive: bool) -> List[Path]:
+    has_suffix = _SUFFIX_RE.search
+    p = Path(raw)
+    if p.exists():
+        if p.is_dir():
+            if recursive:
+                return list(_walk(p))
+            return list(_list_dir(p))
+        if has_suffix(raw) is not None:
+            return [p]
+        return []
+    # Treat as glob pattern
+    # suffix check first so non-matching hits never cost a stat()
+    return [Path(g) for g in glob.glob(raw, recursive=recursive) if has_suffix(g) is not None and os.path.isfile(g)]
+
+
 def expand_inputs(inputs: Sequence[str], recursive: bool) -> List[Path]:
-    paths: List[Path] = []
-    for raw in inputs:
-        p = Path(raw)
-        if p.exists():
-            if p.is_dir():
-                if recursive:
-                    for ext in ALLOWED_SUFFIXES:
-                        paths.extend(p.rglob(f"*{ext}"))
-                else:
-                    paths.extend([x for x in p.iterdir() if x.is_file() and x.suffix.lower() in ALLOWED_SUFFIXES])
-            else:
-                if p.suffix.lower() in ALLOWED_SUFFIXES:
-                    paths.append(p)
+    has_suffix = _SUFFIX_RE.search
+    found: List[List[Path]] = [[] for _ in inputs]
+    roots: List[int] = []
+    for i, raw in enumerate(inputs):
+        if os.path.isfile(raw):
+            # shell-expanded file lists are the common case and need no worker thread
+            if has_suffix(raw) is not None:
+                found[i] = [Path(raw)]
         else:
-            # Treat as glob pattern
-            import glob
-
-            for g in glob.glob(raw, recursive=recursive):
-                gp = Path(g)
-                if gp.is_file() and gp.suffix.lower() in ALLOWED_SUFFIXES:
-                    paths.append(gp)
-    # De-duplicate while preserving order
-    seen: Set[Path] = set()
+            roots.append(i)
+    if len(roots) > 1:
+        # walking folders/globs is I/O-bound, so several of them (esp. on network shares)
+        # expand well in threads; map() keeps the results in argument order
+        with ThreadPoolExecutor(max_workers=min(32, len(roots))) as pool:
+            walked = pool.map(_expand_one, [inputs[i] for i in roots], [recursive] * len(roots))
+            for i, paths_i in zip(roots, walked):
+                found[i] = paths_i
+    else:
+        for i in roots:
+            found[i] = _expand_one(inputs[i], recursive)
+    paths = [x for group in found for x in group]
+    # De-duplicate while preserving order; str keys hash cheaper than Path objects
+    seen: Set[str] = set()
     unique: List[Path] = []
     for x in paths:
-        if x not in seen:
+        key = os.fspath(x)
+        if key not in seen:
             unique.append(x)
-            seen.add(x)
+            seen.add(key)
     return unique
 
 
 def build_output_path(inp: Path, output_dir: Optional[Path], inplace: bool, suffix: str) -> Path:
+    base = os.path.splitext(os.fspath(inp))[0]
     if output_dir and not inplace:
-        output_dir.mkdir(parents=True, exist_ok=True)
-        return output_dir / f"{inp.stem}{suffix}.pdf"
+        return Path(os.path.join(os.fspath(output_dir), os.path.basename(base) + suffix + ".pdf"))
     # in-place next to the input
-    return inp.with_name(f"{inp.stem}{suffix}.pdf")
+    return Path(base + suffix + ".pdf")
 
 
-def run_ocr(
+@functools.lru_cache(maxsize=None)
+def _folds_case(folder: str) -> bool:
+    # one stat per output folder: does the filesystem treat the swapped-case spelling as the same entry?
+    # (NTFS and macOS' default volumes do; os.path.normcase only knows about Windows)
+    head, tail = os.path.split(os.path.abspath(folder))
+    while tail and tail.swapcase() == tail:
+        # no cased letters to probe with, try the parent folder
+        head, tail = os.path.split(head)
+    if tail:
+        try:
+            return os.path.samestat(os.stat(os.path.join(head, tail)), os.stat(os.path.join(head, tail.swapcase())))
+        except OSError:
+            pass
+    return os.path.normcase("A") == "a"
+
+
+def output_key(path: str) -> str:
+    # key under which an output path is looked up in `existing` / claimed sets, folded like the filesystem does
+    path = os.path.abspath(path)
+    return path.casefold() if _folds_case(os.path.dirname(path)) else path
+
+
+async def run_ocr(
     inp: Path,
     out: Path,
     lang: str,
@@ -85,57 +171,153 @@ def run_ocr(
     ocrmypdf_exe: str,
     extra_args: Sequence[str] = (),
     quiet: bool = False,
+    existing: Optional[Set[str]] = None,
+    claimed: Optional[Set[str]] = None,
 ) -> JobResult:
-    if not overwrite and out.exists():
+    # `existing` is a snapshot of the output folder's keys, taken once instead of a stat() per job;
+    # `claimed` holds the outputs already handed to ocrmypdf during this run
+    key = output_key(os.fspath(out))
+    if claimed is not None and key in claimed:
+        # another input of this run maps to the same output (scan.pdf + scan.png); never let two
+        # processes write one file, even with --overwrite
+        return JobResult(inp, out, 0, 0.0, "skipped: exists")
+    already_there = key in existing if existing is not None else out.exists()
+    if not overwrite and already_there:
         # Simulate skip with 0 code, do not invoke ocrmypdf
         return JobResult(inp, out, 0, 0.0, "skipped: exists")
+    if claimed is not None:
+        # claimed before the first await, so the next task already sees it
+        claimed.add(key)
 
     cmd = [
         ocrmypdf_exe,
+        *extra_args,
+        *(["--pdfa-2"] if pdfa else []),
+        "--force-ocr" if force else "--skip-text",
         "--optimize",
         "3",
         "--language",
         lang,
-        str(inp),
-        str(out),
+        os.fspath(inp),
+        os.fspath(out),
     ]
-    if force:
-        cmd.insert(1, "--force-ocr")
-    else:
-        cmd.insert(1, "--skip-text")
-    if pdfa:
-        cmd.insert(1, "--pdfa-2")
-    if extra_args:
-        cmd[1:1] = list(extra_args)
 
     start = time.time()
-    p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    p = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+    # drain the pipe as ocrmypdf writes, but only keep enough bytes for LOG_HEAD_CHARS characters
+    # (4 bytes covers the widest UTF-8 sequence, so a split character always falls past the cut)
+    head_limit = LOG_HEAD_CHARS * 4
+    head_buf = bytearray()
+    assert p.stdout is not None
+    while True:
+        chunk = await p.stdout.read(1 << 16)
+        if not chunk:
+            break
+        if len(head_buf) < head_limit:
+            head_buf += chunk[: head_limit - len(head_buf)]
+    returncode = await p.wait()
     dur = time.time() - start
-    head = (p.stdout or "")[:1200]
-    return JobResult(inp, out, p.returncode, dur, head)
-
-
-def write_log_header_if_needed(log_path: Path) -> None:
-    if not log_path.exists() or log_path.stat().st_size == 0:
-        log_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(log_path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(["When", "Input", "Output", "ReturnCode", "DurationSec", "OutputLogHead"])
-
-
-def append_log(log_path: Path, result: JobResult) -> None:
-    with open(log_path, "a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(
-            [
-                datetime.now().isoformat(timespec="seconds"),
-                str(result.input_path),
-                str(result.output_path),
-                result.returncode,
-                f"{result.duration_s:.2f}",
-                result.log_head.replace("\n", " ").replace("\r", " ")[:2000],
-            ]
-        )
+    # decode like text=True did: locale encoding and universal newlines
+    text = head_buf.decode(locale.getpreferredencoding(False), errors="replace")
+    head = text.replace("\r\n", "\n").replace("\r", "\n")[:LOG_HEAD_CHARS]
+    return JobResult(inp, out, returncode, dur, head)
+
+
+def plan_jobs(inputs: Iterable[Path], output_dir: Optional[Path], inplace: bool, suffix: str) -> List[Tuple[Path, Path]]:
+    jobs: List[Tuple[Path, Path]] = []
+    for inp in inputs:
+        out = build_output_path(inp, output_dir, inplace, suffix)
+        # avoid creating output that equals input (shouldn't happen but be safe);
+        # only a shared file name can collide, so resolve() just in that case. Compare
+        # casefolded: on NTFS/macOS "A.PDF" -> "A.pdf" is the same file
+        if out.name.casefold() == inp.name.casefold() and out.resolve() == inp.resolve():
+            out = out.with_name(out.stem + "_out.pdf")
+        jobs.append((inp, out))
+    return jobs
+
+
+def largest_first(jobs: Sequence[Tuple[Path, Path]]) -> List[Tuple[Path, Path]]:
+    # longest-processing-time-first: file size is a cheap proxy for OCR effort, so big PDFs
+    # start early instead of dragging out the tail of the run
+    def size(job: Tuple[Path, Path]) -> int:
+        try:
+            return os.stat(job[0]).st_size
+        except OSError:
+            return 0
+
+    return sorted(jobs, key=size, reverse=True)
+
+
+async def run_jobs(
+    jobs: Iterable[Tuple[Path, Path]],
+    max_parallel: int,
+    on_result: Callable[[JobResult], None],
+    *,
+    lang: str,
+    force: bool,
+    overwrite: bool,
+    pdfa: bool,
+    ocrmypdf_exe: str,
+    extra_args: Sequence[str] = (),
+    quiet: bool = False,
+    existing: Optional[Set[str]] = None,
+) -> None:
+    # keep at most max_parallel ocrmypdf processes alive; results are handed back on the main thread
+    pending = iter(jobs)
+    claimed: Set[str] = set()
+    running: Set["asyncio.Task[JobResult]"] = set()
+    while True:
+        while len(running) < max_parallel:
+            job = next(pending, None)
+            if job is None:
+                break
+            inp, out = job
+            coro = run_ocr(
+                inp,
+                out,
+                lang=lang,
+                force=force,
+                overwrite=overwrite,
+                pdfa=pdfa,
+                ocrmypdf_exe=ocrmypdf_exe,
+                extra_args=extra_args,
+                quiet=quiet,
+                existing=existing,
+                claimed=claimed,
+            )
+            running.add(asyncio.ensure_future(coro))
+        if not running:
+            return
+        done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            on_result(task.result())
+
+
+def open_log(log_path: Path) -> TextIO:
+    # one buffered handle for the whole run; rows are flushed in batches by the caller
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    f = open(log_path, "a", buffering=1 << 16, newline="", encoding="utf-8")
+    write_log_header_if_needed(f)
+    return f
+
+
+def write_log_header_if_needed(f: TextIO) -> None:
+    # append mode positions the handle at the end, so tell() == 0 means an empty file
+    if f.tell() == 0:
+        csv.writer(f).writerow(LOG_HEADER)
+
+
+def append_log(writer: RowWriter, result: JobResult) -> None:
+    writer.writerow(
+        [
+            time.strftime("%Y-%m-%dT%H:%M:%S"),
+            str(result.input_path),
+            str(result.output_path),
+            result.returncode,
+            f"{result.duration_s:.2f}",
+            result.log_head[:2000].translate(_NL_TABLE),
+        ]
+    )
 
 
 def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
@@ -185,14 +367,10 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
         print("[INFO] No matching files.", file=sys.stderr)
         return 0
 
+    output_dir = args.output if not args.inplace else None
+
     # Compute output paths and skip list
-    jobs: List[Tuple[Path, Path]] = []
-    for inp in inputs:
-        out = build_output_path(inp, args.output, args.inplace, args.suffix)
-        # avoid creating output that equals input (shouldn't happen but be safe)
-        if out.resolve() == inp.resolve():
-            out = out.with_name(out.stem + "_out.pdf")
-        jobs.append((inp, out))
+    jobs = plan_jobs(inputs, output_dir, args.inplace, args.suffix)
 
     if args.dry_run:
         print("Planned jobs:")
@@ -200,7 +378,20 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
             print(f"  {inp}  ->  {out}")
         return 0
 
-    write_log_header_if_needed(args.log)
+    # filesystem prep only happens for a real run; --dry-run must not create anything
+    existing: Optional[Set[str]] = None
+    if output_dir:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        with os.scandir(output_dir) as it:
+            existing = {output_key(entry.path) for entry in it}
+
+    # constant across jobs, so freeze it once rather than per run_ocr call
+    extra = tuple(args.extra or ())
+
+    log_file = open_log(args.log)
+    log_writer = csv.writer(log_file)
+    unflushed = 0
+    last_flush = time.monotonic()
 
     # progress
     use_progress = (tqdm is not None) and (not args.no_progress) and (not args.quiet)
@@ -209,36 +400,51 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
     failures = 0
     skipped = 0
     results: List[JobResult] = []
-
-    def submit_job(inp_out: Tuple[Path, Path]) -> JobResult:
-        inp, out = inp_out
-        res = run_ocr(
-            inp=inp,
-            out=out,
-            lang=args.lang,
-            force=args.force,
-            overwrite=args.overwrite,
-            pdfa=args.pdfa,
-            ocrmypdf_exe=exe,
-            extra_args=args.extra or (),
-            quiet=args.quiet,
+    pbar_pending = 0
+    last_pbar = time.monotonic()
+
+    # called from the event loop on the main thread, so the log needs no locking
+    def on_result(res: JobResult) -> None:
+        nonlocal failures, skipped, unflushed, last_flush, pbar_pending, last_pbar
+        results.append(res)
+        append_log(log_writer, res)
+        unflushed += 1
+        now = time.monotonic()
+        if unflushed >= LOG_FLUSH_ROWS or now - last_flush > LOG_FLUSH_INTERVAL_S:
+            log_file.flush()
+            unflushed = 0
+            last_flush = now
+        if res.returncode != 0 and res.log_head != "skipped: exists":
+            failures += 1
+        if res.log_head == "skipped: exists":
+            skipped += 1
+        if pbar:
+            # coalesce redraws; a terminal write per finished job adds up on large batches
+            pbar_pending += 1
+            if pbar_pending >= PROGRESS_BATCH or now - last_pbar > PROGRESS_INTERVAL_S:
+                pbar.update(pbar_pending)
+                pbar_pending = 0
+                last_pbar = now
+
+    with log_file:
+        asyncio.run(
+            run_jobs(
+                largest_first(jobs),
+                args.jobs,
+                on_result,
+                lang=args.lang,
+                force=args.force,
+                overwrite=args.overwrite,
+                pdfa=args.pdfa,
+                ocrmypdf_exe=exe,
+                extra_args=extra,
+                quiet=args.quiet,
+                existing=existing,
+            )
         )
-        append_log(args.log, res)
-        return res
-
-    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
-        futures = {pool.submit(submit_job, job): job for job in jobs}
-        for fut in as_completed(futures):
-            res = fut.result()
-            results.append(res)
-            if res.returncode != 0 and res.log_head != "skipped: exists":
-                failures += 1
-            if res.log_head == "skipped: exists":
-                skipped += 1
-            if pbar:
-                pbar.update(1)
 
     if pbar:
+        pbar.update(pbar_pending)
         pbar.close()
 
     done = len(jobs) - skipped
@@ -0,0 +1,24 @@
+import csv
+from pathlib import Path
+from ocr_converter.cli import JobResult, LOG_HEADER, append_log, open_log
+
+def _result(name: str) -> JobResult:
+    return JobResult(Path(f"{name}.pdf"), Path(f"{name}_ocr.pdf"), 0, 1.5, "line1\nline2\r")
+
+def test_open_log_writes_header_once(tmp_path: Path):
+    log = tmp_path / "logs" / "ocr_log.csv"
+    with open_log(log) as f:
+        append_log(csv.writer(f), _result("a"))
+    with open_log(log) as f:
+        append_log(csv.writer(f), _result("b"))
+    rows = list(csv.reader(log.open(newline="", encoding="utf-8")))
+    assert rows[0] == LOG_HEADER
+    assert [r[1] for r in rows[1:]] == ["a.pdf", "b.pdf"]
+    assert rows[1][5] == "line1 line2 "
+
+def test_open_log_keeps_existing_content(tmp_path: Path):
+    log = tmp_path / "ocr_log.csv"
+    log.write_text("old,row\n", encoding="utf-8")
+    with open_log(log):
+        pass
+    assert log.read_text(encoding="utf-8") == "old,row\n"
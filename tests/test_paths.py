@@ -1,5 +1,5 @@
 from pathlib import Path
-from ocr_converter.cli import expand_inputs, build_output_path, ALLOWED_SUFFIXES
+from ocr_converter.cli import expand_inputs, build_output_path, largest_first, plan_jobs, ALLOWED_SUFFIXES
 
 def test_suffix_set():
     assert ".pdf" in ALLOWED_SUFFIXES
@@ -23,3 +23,90 @@ def test_expand_inputs_glob(tmp_path: Path, monkeypatch):
     f3.write_bytes(b"")
     res = expand_inputs([str(tmp_path/"*.pdf"), str(tmp_path/"*.png")], recursive=False)
     assert f1 in res and f2 in res and f3 not in res
+
+def test_expand_inputs_recursive_dir(tmp_path: Path):
+    sub = tmp_path / "sub" / "deeper"
+    sub.mkdir(parents=True)
+    f1 = tmp_path / "a.pdf"
+    f2 = sub / "b.JPG"
+    f3 = sub / "c.txt"
+    for f in (f1, f2, f3):
+        f.write_bytes(b"")
+    res = expand_inputs([str(tmp_path)], recursive=True)
+    assert sorted(res) == sorted([f1, f2])
+    flat = expand_inputs([str(tmp_path)], recursive=False)
+    assert flat == [f1]
+
+def test_largest_first(tmp_path: Path):
+    small = tmp_path / "small.pdf"
+    big = tmp_path / "big.pdf"
+    small.write_bytes(b"x")
+    big.write_bytes(b"x" * 100)
+    missing = tmp_path / "gone.pdf"
+    jobs = [(small, tmp_path / "s_ocr.pdf"), (missing, tmp_path / "g_ocr.pdf"), (big, tmp_path / "b_ocr.pdf")]
+    assert [inp for inp, _ in largest_first(jobs)] == [big, small, missing]
+
+def test_expand_inputs_recursive_skips_unreadable_dir(tmp_path: Path, monkeypatch):
+    import os
+    locked = tmp_path / "locked"
+    locked.mkdir()
+    (locked / "hidden.pdf").write_bytes(b"")
+    f1 = tmp_path / "a.pdf"
+    f1.write_bytes(b"")
+    real_scandir = os.scandir
+
+    def scandir(path):
+        if os.fspath(path) == str(locked):
+            raise PermissionError(13, "Permission denied", str(path))
+        return real_scandir(path)
+
+    # chmod is ignored when the suite runs as root, so deny access at the scandir level
+    monkeypatch.setattr(os, "scandir", scandir)
+    assert expand_inputs([str(tmp_path)], recursive=True) == [f1]
+    assert expand_inputs([str(tmp_path), str(tmp_path / "*.pdf")], recursive=True) == [f1]
+
+def test_expand_inputs_ignores_bare_suffix_dotfiles(tmp_path: Path):
+    dotfile = tmp_path / ".pdf"
+    f1 = tmp_path / "a.PDF"
+    dotfile.write_bytes(b"")
+    f1.write_bytes(b"")
+    assert expand_inputs([str(tmp_path)], recursive=False) == [f1]
+    assert expand_inputs([str(tmp_path)], recursive=True) == [f1]
+    assert expand_inputs([str(dotfile)], recursive=False) == []
+
+def test_expand_inputs_multi_root_order_and_dedup(tmp_path: Path):
+    d1 = tmp_path / "d1"
+    d2 = tmp_path / "d2"
+    d1.mkdir()
+    d2.mkdir()
+    b = d1 / "b.pdf"
+    a = d2 / "a.pdf"
+    loose = tmp_path / "loose.png"
+    for f in (a, b, loose):
+        f.write_bytes(b"")
+    res = expand_inputs([str(d2), str(loose), str(d1), str(d1 / "*.pdf"), str(a)], recursive=False)
+    assert res == [a, loose, b]
+
+def test_expand_inputs_literal_files_skip_the_pool(tmp_path: Path, monkeypatch):
+    import ocr_converter.cli as cli
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("thread pool started for literal file paths")
+
+    monkeypatch.setattr(cli, "ThreadPoolExecutor", no_pool)
+    files = [tmp_path / f"{n}.pdf" for n in "cab"]
+    for f in files:
+        f.write_bytes(b"")
+    assert expand_inputs([str(f) for f in files] + [str(tmp_path)], recursive=False) == files
+
+def test_plan_jobs_catches_case_only_collision(tmp_path: Path, monkeypatch):
+    import os
+    src = tmp_path / "A.PDF"
+    src.write_bytes(b"")
+    # simulate a case-insensitive filesystem (NTFS, default macOS volumes): resolve() folds case
+    monkeypatch.setattr(Path, "resolve", lambda self, strict=False: Path(os.path.abspath(self).casefold()))
+    [(inp, out)] = plan_jobs([src], None, True, "")
+    assert inp == src
+    assert out.name == "A_out.pdf"
+    [(_, out_sfx)] = plan_jobs([src], None, True, "_ocr")
+    assert out_sfx.name == "A_ocr.pdf"
@@ -0,0 +1,166 @@
+import asyncio
+import locale
+import os
+from pathlib import Path
+from typing import List
+
+import pytest
+
+import ocr_converter.cli as cli
+from ocr_converter.cli import LOG_HEAD_CHARS, JobResult, output_key, run_jobs, run_ocr
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="stub ocrmypdf is a POSIX shell script")
+
+
+def _stub(tmp_path: Path, body: str) -> str:
+    exe = tmp_path / "ocrmypdf"
+    exe.write_text("#!/bin/sh\nfor a; do inp=$out; out=$a; done\n" + body)
+    exe.chmod(0o755)
+    return str(exe)
+
+
+def _run(jobs, exe: str, max_parallel: int, overwrite: bool = False, **kwargs) -> List[JobResult]:
+    results: List[JobResult] = []
+    asyncio.run(
+        run_jobs(
+            jobs,
+            max_parallel,
+            results.append,
+            lang="eng",
+            force=False,
+            overwrite=overwrite,
+            pdfa=False,
+            ocrmypdf_exe=exe,
+            **kwargs,
+        )
+    )
+    return results
+
+
+def test_run_jobs_limits_parallelism_and_passes_returncodes(tmp_path: Path):
+    trace = tmp_path / "trace.txt"
+    exe = _stub(
+        tmp_path,
+        f'echo start >> "{trace}"\nsleep 0.2\necho end >> "{trace}"\n'
+        'case "$inp" in *fail*) exit 3;; esac\ncp "$inp" "$out"\n',
+    )
+    jobs = []
+    for name in ("a", "b", "fail", "c", "d"):
+        inp = tmp_path / f"{name}.pdf"
+        inp.write_bytes(b"x")
+        jobs.append((inp, tmp_path / f"{name}_ocr.pdf"))
+
+    results = _run(jobs, exe, max_parallel=2)
+
+    assert sorted(r.input_path.name for r in results) == sorted(inp.name for inp, _ in jobs)
+    codes = {r.input_path.stem: r.returncode for r in results}
+    assert codes == {"a": 0, "b": 0, "fail": 3, "c": 0, "d": 0}
+    running = peak = 0
+    for line in trace.read_text().split():
+        running += 1 if line == "start" else -1
+        peak = max(peak, running)
+    assert peak == 2
+
+
+def test_run_jobs_skips_existing_outputs(tmp_path: Path):
+    trace = tmp_path / "trace.txt"
+    exe = _stub(tmp_path, f'echo "$inp" >> "{trace}"\n')
+    inp = tmp_path / "a.pdf"
+    out = tmp_path / "a_ocr.pdf"
+    inp.write_bytes(b"x")
+    out.write_bytes(b"done")
+
+    results = _run([(inp, out)], exe, max_parallel=4)
+
+    assert [(r.returncode, r.log_head) for r in results] == [(0, "skipped: exists")]
+    assert not trace.exists()
+
+
+@pytest.mark.parametrize("max_parallel", [1, 2])
+def test_run_jobs_skips_outputs_claimed_earlier_in_the_run(tmp_path: Path, max_parallel: int):
+    trace = tmp_path / "trace.txt"
+    exe = _stub(tmp_path, f'echo "$inp" >> "{trace}"\nsleep 0.1\ncp "$inp" "$out"\n')
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    jobs = []
+    for name in ("scan.pdf", "scan.png"):
+        inp = tmp_path / name
+        inp.write_bytes(b"x")
+        jobs.append((inp, out_dir / "scan_ocr.pdf"))
+
+    results = _run(jobs, exe, max_parallel=max_parallel, existing=set())
+
+    assert trace.read_text().splitlines() == [str(tmp_path / "scan.pdf")]
+    assert sorted(r.log_head == "skipped: exists" for r in results) == [False, True]
+
+
+
+def test_run_jobs_claims_outputs_in_place(tmp_path: Path):
+    trace = tmp_path / "trace.txt"
+    exe = _stub(tmp_path, f'echo "$inp" >> "{trace}"\nsleep 0.1\ncp "$inp" "$out"\n')
+    jobs = []
+    for name in ("a.pdf", "a.png"):
+        inp = tmp_path / name
+        inp.write_bytes(b"x")
+        jobs.append((inp, tmp_path / "a_ocr.pdf"))
+
+    results = _run(jobs, exe, max_parallel=2, overwrite=True)
+
+    assert trace.read_text().splitlines() == [str(tmp_path / "a.pdf")]
+    assert sorted(r.log_head == "skipped: exists" for r in results) == [False, True]
+
+
+def test_run_jobs_folds_case_on_case_insensitive_folders(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(cli, "_folds_case", lambda folder: True)
+    trace = tmp_path / "trace.txt"
+    exe = _stub(tmp_path, f'echo "$inp" >> "{trace}"\n')
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    jobs = []
+    for name in ("scan.pdf", "Scan.png", "other.pdf"):
+        inp = tmp_path / name
+        inp.write_bytes(b"x")
+        jobs.append((inp, out_dir / f"{Path(name).stem}_ocr.pdf"))
+    existing = {output_key(str(out_dir / "OTHER_ocr.pdf"))}
+
+    results = _run(jobs, exe, max_parallel=2, existing=existing)
+
+    assert trace.read_text().splitlines() == [str(tmp_path / "scan.pdf")]
+    assert sum(r.log_head == "skipped: exists" for r in results) == 2
+
+
+def test_folds_case_probe(tmp_path: Path):
+    folder = tmp_path / "Probe"
+    folder.mkdir()
+    cli._folds_case.cache_clear()
+    assert cli._folds_case(str(folder)) == (tmp_path / "pROBE").exists()
+
+def test_run_ocr_keeps_log_head_and_drains_pipe(tmp_path: Path):
+    # well past the 64 KiB pipe buffer: the stub would block forever if the pipe were not drained
+    exe = _stub(tmp_path, 'head -c 300000 /dev/zero | tr "\\0" "x"\necho tail\n')
+    inp = tmp_path / "a.pdf"
+    inp.write_bytes(b"x")
+    coro = run_ocr(inp, tmp_path / "a_ocr.pdf", "eng", False, False, False, exe)
+
+    res = asyncio.run(asyncio.wait_for(coro, timeout=10))
+
+    assert res.returncode == 0
+    assert res.log_head == "x" * LOG_HEAD_CHARS
+
+
+def test_run_ocr_cuts_log_head_on_characters(tmp_path: Path):
+    encoding = locale.getpreferredencoding(False)
+    try:
+        text = "x" * (LOG_HEAD_CHARS - 1) + "Überweisung\r\n" * 10
+        payload = text.encode(encoding)
+    except UnicodeEncodeError:
+        pytest.skip(f"locale encoding {encoding} cannot represent the sample")
+    data = tmp_path / "out.txt"
+    data.write_bytes(payload)
+    exe = _stub(tmp_path, f'cat "{data}"\n')
+    inp = tmp_path / "a.pdf"
+    inp.write_bytes(b"x")
+
+    res = asyncio.run(run_ocr(inp, tmp_path / "a_ocr.pdf", "eng", False, False, False, exe))
+
+    assert res.log_head == "x" * (LOG_HEAD_CHARS - 1) + "Ü"